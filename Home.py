@@ -1,11 +1,13 @@
 import os
 from pathlib import Path
 
-import pandas as pd
 import plotly.express as px
 import streamlit as st
 
-from utils.data import load_data, apply_common_filters, get_distinct_values
+from utils.charts import scatter_or_raster
+from utils.common import add_trendlines
+from utils.data import filter_key, filtered_data, ols_lines, ranked_by_country
+from utils.ui import sidebar_filters
 
 
 st.set_page_config(
@@ -20,7 +22,9 @@ DATA_PATH = str(Path(__file__).with_name("Global finance data.csv"))
 
 
 @st.cache_data(show_spinner=False)
-def compute_kpis(df: pd.DataFrame) -> dict:
+def compute_kpis(csv_path: str, key: tuple) -> dict:
+    # Keyed on the filter selection like the cached helpers in utils.data, not on the frame's contents
+    df = filtered_data(csv_path, key)
     kpis = {}
     if "Market_Cap_Trillion_USD" in df.columns:
         kpis["Total Market Cap (T$)"] = round(df["Market_Cap_Trillion_USD"].sum(), 2)
@@ -33,31 +37,15 @@ def compute_kpis(df: pd.DataFrame) -> dict:
     return kpis
 
 
-def sidebar_filters(df: pd.DataFrame):
-    meta = get_distinct_values(df)
-    st.sidebar.markdown("### Filters")
-    countries = st.sidebar.multiselect("Country", options=meta["countries"], default=meta["countries"])
-    ratings = st.sidebar.multiselect("Credit Rating", options=meta["credit_ratings"], default=meta["credit_ratings"])
-    date_values = meta["dates"]
-    date_filter = None
-    if date_values:
-        min_date, max_date = min(date_values), max(date_values)
-        date_range = st.sidebar.date_input("Date range", value=(min_date, max_date))
-        # Convert to pandas timestamps
-        if isinstance(date_range, tuple) and len(date_range) == 2:
-            date_filter = [pd.to_datetime(date_range[0]), pd.to_datetime(date_range[1])]
-    return countries, ratings, date_filter
-
-
 def main():
     st.title("Global Finance Dashboard")
     st.caption("Interactive multi-page analytics built with Streamlit and Plotly")
 
-    df = load_data(DATA_PATH)
-    countries, ratings, date_filter = sidebar_filters(df)
-    fdf = apply_common_filters(df, countries, ratings, date_filter)
+    countries, ratings, date_filter, extra_filters = sidebar_filters(DATA_PATH, heading="### Filters")
+    key = filter_key(countries, ratings, date_filter, extra_filters)
+    fdf = filtered_data(DATA_PATH, key)
 
-    kpis = compute_kpis(fdf)
+    kpis = compute_kpis(DATA_PATH, key)
     kpi_cols = st.columns(len(kpis) or 1)
     for i, (label, value) in enumerate(kpis.items()):
         with kpi_cols[i]:
@@ -70,7 +58,7 @@ def main():
         st.subheader("Market Cap by Country (T$)")
         if {"Country", "Market_Cap_Trillion_USD"}.issubset(fdf.columns):
             fig = px.bar(
-                fdf.sort_values("Market_Cap_Trillion_USD", ascending=False),
+                ranked_by_country(DATA_PATH, key, "Market_Cap_Trillion_USD"),
                 x="Country",
                 y="Market_Cap_Trillion_USD",
                 color="Market_Cap_Trillion_USD",
@@ -91,26 +79,28 @@ def main():
     plot_cols = st.columns(2)
     with plot_cols[0]:
         if {"Index_Value", "Daily_Change_Percent", "Country"}.issubset(fdf.columns):
-            fig = px.scatter(
-                fdf,
+            fig = scatter_or_raster(
+                DATA_PATH,
+                key,
                 x="Index_Value",
                 y="Daily_Change_Percent",
                 color="Country",
                 hover_data=["Stock_Index"],
-                trendline="ols",
             )
+            add_trendlines(fig, ols_lines(DATA_PATH, key, "Index_Value", "Daily_Change_Percent", "Country"))
             st.plotly_chart(fig, use_container_width=True)
             st.markdown("**Insights**: A big index number does not always mean a big daily move.")
             st.markdown("**Conclusion**: Day-to-day moves vary; do not assume size controls moves.")
     with plot_cols[1]:
         if {"GDP_Growth_Rate_Percent", "Inflation_Rate_Percent"}.issubset(fdf.columns):
-            fig = px.scatter(
-                fdf,
+            fig = scatter_or_raster(
+                DATA_PATH,
+                key,
                 x="Inflation_Rate_Percent",
                 y="GDP_Growth_Rate_Percent",
                 color="Country",
-                trendline="ols",
             )
+            add_trendlines(fig, ols_lines(DATA_PATH, key, "Inflation_Rate_Percent", "GDP_Growth_Rate_Percent", "Country"))
             st.plotly_chart(fig, use_container_width=True)
             st.markdown("**Insights**: The link between inflation and growth differs by country.")
             st.markdown("**Conclusion**: Compare countries separately; one rule does not fit all.")
@@ -118,8 +108,9 @@ def main():
     plot_cols2 = st.columns(2)
     with plot_cols2[0]:
         if {"Bond_Yield_10Y_Percent", "Interest_Rate_Percent"}.issubset(fdf.columns):
-            fig = px.scatter(
-                fdf,
+            fig = scatter_or_raster(
+                DATA_PATH,
+                key,
                 x="Interest_Rate_Percent",
                 y="Bond_Yield_10Y_Percent",
                 color="Country",
@@ -1,13 +1,30 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 
 from flask import Flask, render_template, request
+import numpy as np
 import pandas as pd
 import plotly.express as px
-import plotly.figure_factory as ff
+import plotly.graph_objects as go
+import plotly.io as pio
 from plotly.offline import plot as plotly_plot
 
-from flask_utils.data import load_data, apply_common_filters, get_distinct_values
+from flask_utils.data import (
+    load_data,
+    aggregate_by_country,
+    build_parquet_filters,
+    build_prediction_state,
+    rasterize_points,
+    correlation_matrix,
+    get_distinct_values,
+    ols_lines,
+    ranked_by_country,
+)
+from utils.common import RASTER_THRESHOLD, add_trendlines, annotated_heatmap, category_raster
 
 
 app = Flask(__name__)
@@ -37,6 +54,57 @@ def _plot_div(fig) -> str:
     return plotly_plot(fig, output_type="div", include_plotlyjs=False, show_link=False, config={"displayModeBar": True})
 
 
+def _scatter(df: pd.DataFrame, x: str, y: str, color: str, **kwargs) -> go.Figure:
+    # Large frames go out as a fixed-size per-group raster instead of one SVG point per row
+    if len(df) <= RASTER_THRESHOLD:
+        return px.scatter(df, x=x, y=y, color=color, **kwargs)
+    return category_raster(*rasterize_points(df, x, y, color), x, y, color)
+
+
+_DIV_CACHE: "OrderedDict[tuple, Optional[str]]" = OrderedDict()
+_DIV_CACHE_LOCK = threading.Lock()
+_DIV_CACHE_SIZE = 256
+_BUILD_LOCK = threading.Lock()
+
+
+def _cached_plot_div(key: tuple, build: Callable[[], Optional[go.Figure]]) -> Optional[str]:
+    # Serialized divs are reused for repeat requests with the same chart, data version and filters
+    with _DIV_CACHE_LOCK:
+        if key in _DIV_CACHE:
+            _DIV_CACHE.move_to_end(key)
+            return _DIV_CACHE[key]
+    # plotly express mutates shared defaults while building, so only serialization runs concurrently
+    with _BUILD_LOCK:
+        fig = build()
+    div = _plot_div(fig) if fig is not None else None
+    with _DIV_CACHE_LOCK:
+        _DIV_CACHE[key] = div
+        if len(_DIV_CACHE) > _DIV_CACHE_SIZE:
+            _DIV_CACHE.popitem(last=False)
+    return div
+
+
+_CHART_POOL = ThreadPoolExecutor(max_workers=4)
+# Load the default template up front rather than on first use inside a pool thread
+pio.templates[pio.templates.default]
+
+
+def _render_divs(page: str, filter_key: tuple, builders: Dict[str, Callable[[], Optional[go.Figure]]]) -> Dict[str, Optional[str]]:
+    # Cold charts are serialized side by side; warm hits come straight from the div cache
+    data_version = os.path.getmtime(DATA_PATH)
+    names = list(builders)
+    divs = _CHART_POOL.map(lambda name: _cached_plot_div((page, name, data_version, filter_key), builders[name]), names)
+    return dict(zip(names, divs))
+
+
+@app.after_request
+def _add_cache_headers(response):
+    # Pages are a pure function of the query string and the data file, so let browsers/CDNs keep them briefly
+    if request.method == "GET" and response.status_code == 200 and request.endpoint != "static":
+        response.headers.setdefault("Cache-Control", "public, max-age=300")
+    return response
+
+
 @app.route("/")
 def index():
     return render_template("index.html")
@@ -46,7 +114,8 @@ def dashboard():
     df = load_data(DATA_PATH)
     meta = get_distinct_values(df)
     countries, ratings, date_filter = _get_query_params(meta)
-    fdf = apply_common_filters(df, countries, ratings, date_filter)
+    filters = build_parquet_filters(countries, ratings, date_filter)
+    fdf = load_data(DATA_PATH, filters=filters)
 
     # KPIs
     kpis = {}
@@ -59,48 +128,47 @@ def dashboard():
     if "Bond_Yield_10Y_Percent" in fdf.columns:
         kpis["Avg 10Y Yield (%)"] = round(float(fdf["Bond_Yield_10Y_Percent"].mean()), 2)
 
-    market_cap_div = None
-    if {"Country", "Market_Cap_Trillion_USD"}.issubset(fdf.columns):
-        fig = px.bar(
-            fdf.sort_values("Market_Cap_Trillion_USD", ascending=False),
+    def market_cap():
+        if not {"Country", "Market_Cap_Trillion_USD"}.issubset(fdf.columns):
+            return None
+        return px.bar(
+            ranked_by_country(fdf, "Market_Cap_Trillion_USD"),
             x="Country",
             y="Market_Cap_Trillion_USD",
             color="Market_Cap_Trillion_USD",
             color_continuous_scale="Blues",
         )
-        market_cap_div = _plot_div(fig)
 
-    rel_scatter1_div = None
-    if {"Index_Value", "Daily_Change_Percent", "Country"}.issubset(fdf.columns):
-        fig = px.scatter(
+    def rel_scatter1():
+        if not {"Index_Value", "Daily_Change_Percent", "Country"}.issubset(fdf.columns):
+            return None
+        fig = _scatter(
             fdf,
             x="Index_Value",
             y="Daily_Change_Percent",
             color="Country",
             hover_data=["Stock_Index"],
-            trendline="ols",
         )
-        rel_scatter1_div = _plot_div(fig)
+        return add_trendlines(fig, ols_lines(fdf, "Index_Value", "Daily_Change_Percent", "Country"))
 
-    rel_scatter2_div = None
-    if {"Bond_Yield_10Y_Percent", "Interest_Rate_Percent"}.issubset(fdf.columns):
-        fig = px.scatter(
+    def rel_scatter2():
+        if not {"Bond_Yield_10Y_Percent", "Interest_Rate_Percent"}.issubset(fdf.columns):
+            return None
+        return _scatter(
             fdf,
             x="Interest_Rate_Percent",
             y="Bond_Yield_10Y_Percent",
             color="Country",
         )
-        rel_scatter2_div = _plot_div(fig)
+
+    divs = _render_divs("dashboard", filters, {"market_cap_div": market_cap, "rel_scatter1_div": rel_scatter1, "rel_scatter2_div": rel_scatter2})
 
     return render_template(
         "dashboard.html",
         meta=meta,
         selected={"countries": countries, "ratings": ratings, "start_date": request.args.get("start_date"), "end_date": request.args.get("end_date")},
         kpis=kpis,
-        market_cap_div=market_cap_div,
-        rel_scatter1_div=rel_scatter1_div,
-        rel_scatter2_div=rel_scatter2_div,
-        table=fdf.head(20).to_html(classes="table table-sm table-striped", index=False),
+        **divs,
     )
 
 
@@ -110,37 +178,38 @@ def equity_markets():
     meta = get_distinct_values(df)
     countries, ratings, date_filter = _get_query_params(meta)
     indices = request.args.getlist("index") or meta.get("stock_indices", [])
-    fdf = apply_common_filters(df, countries, ratings, date_filter)
-    if indices:
-        fdf = fdf[fdf["Stock_Index"].isin(indices)]
-
-    divs = {"bar_index_value": None, "bar_daily_change": None, "scatter_cap_vs_index": None, "treemap_cap": None, "box_index_value": None, "heatmap_corr": None}
-
-    if {"Country", "Index_Value"}.issubset(fdf.columns):
-        fig = px.bar(
-            fdf.sort_values("Index_Value", ascending=False),
+    filters = build_parquet_filters(countries, ratings, date_filter, {"Stock_Index": indices})
+    fdf = load_data(DATA_PATH, filters=filters)
+
+    def bar_index_value():
+        if not {"Country", "Stock_Index", "Index_Value"}.issubset(fdf.columns):
+            return None
+        return px.bar(
+            ranked_by_country(fdf, "Index_Value", ("Stock_Index",)),
             x="Country",
             y="Index_Value",
             color="Index_Value",
             color_continuous_scale="Viridis",
             hover_data=["Stock_Index"],
         )
-        divs["bar_index_value"] = _plot_div(fig)
 
-    if {"Country", "Daily_Change_Percent"}.issubset(fdf.columns):
-        fig = px.bar(
-            fdf,
+    def bar_daily_change():
+        if not {"Country", "Daily_Change_Percent"}.issubset(fdf.columns):
+            return None
+        agg = aggregate_by_country(fdf, ("Daily_Change_Percent",))
+        return px.bar(
+            agg,
             x="Country",
             y="Daily_Change_Percent",
-            color=(fdf["Daily_Change_Percent"] >= 0).map({True: "Gain", False: "Loss"}),
+            color=np.where(agg["Daily_Change_Percent"].to_numpy() >= 0, "Gain", "Loss"),
             color_discrete_map={"Gain": "#2ca02c", "Loss": "#d62728"},
         )
-        divs["bar_daily_change"] = _plot_div(fig)
 
-    needed = {"Market_Cap_Trillion_USD", "Index_Value", "Daily_Change_Percent", "Country"}
-    if needed.issubset(fdf.columns):
+    def scatter_cap_vs_index():
+        if not {"Market_Cap_Trillion_USD", "Index_Value", "Daily_Change_Percent", "Country"}.issubset(fdf.columns):
+            return None
         size_series = fdf["Daily_Change_Percent"].abs()
-        fig = px.scatter(
+        return px.scatter(  # sized bubbles, kept as points
             fdf.assign(SizeAbs=size_series),
             x="Index_Value",
             y="Market_Cap_Trillion_USD",
@@ -148,27 +217,44 @@ def equity_markets():
             color="Country",
             hover_data=["Stock_Index"],
         )
-        divs["scatter_cap_vs_index"] = _plot_div(fig)
 
-    if {"Country", "Stock_Index", "Market_Cap_Trillion_USD"}.issubset(fdf.columns):
-        fig = px.treemap(
-            fdf,
+    def treemap_cap():
+        if not {"Country", "Stock_Index", "Market_Cap_Trillion_USD"}.issubset(fdf.columns):
+            return None
+        # px.treemap groups path columns without observed=True, so hand it plain labels
+        leaves = aggregate_by_country(fdf, ("Market_Cap_Trillion_USD",), ("Stock_Index",)).astype({"Country": object, "Stock_Index": object})
+        return px.treemap(
+            leaves,
             path=["Country", "Stock_Index"],
             values="Market_Cap_Trillion_USD",
             color="Market_Cap_Trillion_USD",
             color_continuous_scale="Blues",
         )
-        divs["treemap_cap"] = _plot_div(fig)
 
-    if {"Index_Value"}.issubset(fdf.columns):
-        fig = px.box(fdf, y="Index_Value", points="suspectedoutliers")
-        divs["box_index_value"] = _plot_div(fig)
-
-    equity_cols = [c for c in ["Index_Value", "Daily_Change_Percent", "Market_Cap_Trillion_USD", "Commodity_Index", "Bond_Yield_10Y_Percent"] if c in fdf.columns]
-    if len(equity_cols) >= 2:
-        corr = fdf[equity_cols].corr(numeric_only=True)
-        fig = ff.create_annotated_heatmap(z=corr.values.round(2), x=equity_cols, y=equity_cols, colorscale="RdBu", showscale=True, reversescale=True)
-        divs["heatmap_corr"] = _plot_div(fig)
+    def box_index_value():
+        if not {"Index_Value"}.issubset(fdf.columns):
+            return None
+        return px.box(fdf, y="Index_Value", points="suspectedoutliers")
+
+    def heatmap_corr():
+        equity_cols = [c for c in ["Index_Value", "Daily_Change_Percent", "Market_Cap_Trillion_USD", "Commodity_Index", "Bond_Yield_10Y_Percent"] if c in fdf.columns]
+        if len(equity_cols) < 2:
+            return None
+        corr = correlation_matrix(fdf, tuple(equity_cols))
+        return annotated_heatmap(corr, equity_cols, "RdBu", reversescale=True)
+
+    divs = _render_divs(
+        "equity_markets",
+        filters,
+        {
+            "bar_index_value": bar_index_value,
+            "bar_daily_change": bar_daily_change,
+            "scatter_cap_vs_index": scatter_cap_vs_index,
+            "treemap_cap": treemap_cap,
+            "box_index_value": box_index_value,
+            "heatmap_corr": heatmap_corr,
+        },
+    )
 
     return render_template("equity_markets.html", meta=meta, selected={"countries": countries, "ratings": ratings, "indices": indices, "start_date": request.args.get("start_date"), "end_date": request.args.get("end_date")}, **divs)
 
@@ -178,39 +264,58 @@ def macro_and_rates():
     df = load_data(DATA_PATH)
     meta = get_distinct_values(df)
     countries, ratings, date_filter = _get_query_params(meta)
-    fdf = apply_common_filters(df, countries, ratings, date_filter)
-
-    divs = {"bar_gdp": None, "bar_infl": None, "bar_policy": None, "box_unemp": None, "scatter_infl_gdp": None, "scatter_policy_yield": None}
-
-    if {"Country", "GDP_Growth_Rate_Percent"}.issubset(fdf.columns):
-        fig = px.bar(
-            fdf.sort_values("GDP_Growth_Rate_Percent", ascending=False), x="Country", y="GDP_Growth_Rate_Percent", color="GDP_Growth_Rate_Percent", color_continuous_scale="Greens"
+    filters = build_parquet_filters(countries, ratings, date_filter)
+    fdf = load_data(DATA_PATH, filters=filters)
+
+    def bar_gdp():
+        if not {"Country", "GDP_Growth_Rate_Percent"}.issubset(fdf.columns):
+            return None
+        return px.bar(
+            ranked_by_country(fdf, "GDP_Growth_Rate_Percent"), x="Country", y="GDP_Growth_Rate_Percent", color="GDP_Growth_Rate_Percent", color_continuous_scale="Greens"
         )
-        divs["bar_gdp"] = _plot_div(fig)
 
-    if {"Country", "Inflation_Rate_Percent"}.issubset(fdf.columns):
-        fig = px.bar(
-            fdf.sort_values("Inflation_Rate_Percent", ascending=False), x="Country", y="Inflation_Rate_Percent", color="Inflation_Rate_Percent", color_continuous_scale="OrRd"
+    def bar_infl():
+        if not {"Country", "Inflation_Rate_Percent"}.issubset(fdf.columns):
+            return None
+        return px.bar(
+            ranked_by_country(fdf, "Inflation_Rate_Percent"), x="Country", y="Inflation_Rate_Percent", color="Inflation_Rate_Percent", color_continuous_scale="OrRd"
         )
-        divs["bar_infl"] = _plot_div(fig)
 
-    if {"Country", "Interest_Rate_Percent"}.issubset(fdf.columns):
-        fig = px.bar(
-            fdf.sort_values("Interest_Rate_Percent", ascending=False), x="Country", y="Interest_Rate_Percent", color="Interest_Rate_Percent", color_continuous_scale="PuBu"
+    def bar_policy():
+        if not {"Country", "Interest_Rate_Percent"}.issubset(fdf.columns):
+            return None
+        return px.bar(
+            ranked_by_country(fdf, "Interest_Rate_Percent"), x="Country", y="Interest_Rate_Percent", color="Interest_Rate_Percent", color_continuous_scale="PuBu"
         )
-        divs["bar_policy"] = _plot_div(fig)
-
-    if {"Unemployment_Rate_Percent"}.issubset(fdf.columns):
-        fig = px.box(fdf, y="Unemployment_Rate_Percent", points="suspectedoutliers")
-        divs["box_unemp"] = _plot_div(fig)
 
-    if {"Inflation_Rate_Percent", "GDP_Growth_Rate_Percent", "Country"}.issubset(fdf.columns):
-        fig = px.scatter(fdf, x="Inflation_Rate_Percent", y="GDP_Growth_Rate_Percent", color="Country", trendline="ols")
-        divs["scatter_infl_gdp"] = _plot_div(fig)
-
-    if {"Interest_Rate_Percent", "Bond_Yield_10Y_Percent", "Country"}.issubset(fdf.columns):
-        fig = px.scatter(fdf, x="Interest_Rate_Percent", y="Bond_Yield_10Y_Percent", color="Country")
-        divs["scatter_policy_yield"] = _plot_div(fig)
+    def box_unemp():
+        if not {"Unemployment_Rate_Percent"}.issubset(fdf.columns):
+            return None
+        return px.box(fdf, y="Unemployment_Rate_Percent", points="suspectedoutliers")
+
+    def scatter_infl_gdp():
+        if not {"Inflation_Rate_Percent", "GDP_Growth_Rate_Percent", "Country"}.issubset(fdf.columns):
+            return None
+        fig = _scatter(fdf, x="Inflation_Rate_Percent", y="GDP_Growth_Rate_Percent", color="Country")
+        return add_trendlines(fig, ols_lines(fdf, "Inflation_Rate_Percent", "GDP_Growth_Rate_Percent", "Country"))
+
+    def scatter_policy_yield():
+        if not {"Interest_Rate_Percent", "Bond_Yield_10Y_Percent", "Country"}.issubset(fdf.columns):
+            return None
+        return _scatter(fdf, x="Interest_Rate_Percent", y="Bond_Yield_10Y_Percent", color="Country")
+
+    divs = _render_divs(
+        "macro_and_rates",
+        filters,
+        {
+            "bar_gdp": bar_gdp,
+            "bar_infl": bar_infl,
+            "bar_policy": bar_policy,
+            "box_unemp": box_unemp,
+            "scatter_infl_gdp": scatter_infl_gdp,
+            "scatter_policy_yield": scatter_policy_yield,
+        },
+    )
 
     return render_template("macro_and_rates.html", meta=meta, selected={"countries": countries, "ratings": ratings, "start_date": request.args.get("start_date"), "end_date": request.args.get("end_date")}, **divs)
 
@@ -221,43 +326,61 @@ def fx_and_commodities():
     meta = get_distinct_values(df)
     countries, ratings, date_filter = _get_query_params(meta)
     currencies = request.args.getlist("currency") or meta.get("currencies", [])
-    fdf = apply_common_filters(df, countries, ratings, date_filter)
-    if currencies:
-        fdf = fdf[fdf["Currency_Code"].isin(currencies)]
-
-    divs = {"bar_fx_level": None, "bar_fx_ytd": None, "scatter_oil": None, "violin_gold": None, "heatmap_fx": None, "scatter_comm_infl": None}
-
-    if {"Country", "Currency_Code", "Exchange_Rate_USD"}.issubset(fdf.columns):
-        fig = px.bar(fdf.sort_values("Exchange_Rate_USD", ascending=False), x="Currency_Code", y="Exchange_Rate_USD", color="Country")
-        divs["bar_fx_level"] = _plot_div(fig)
-
-    if {"Currency_Code", "Currency_Change_YTD_Percent"}.issubset(fdf.columns):
-        fig = px.bar(
-            fdf,
+    filters = build_parquet_filters(countries, ratings, date_filter, {"Currency_Code": currencies})
+    fdf = load_data(DATA_PATH, filters=filters)
+
+    def bar_fx_level():
+        if not {"Country", "Currency_Code", "Exchange_Rate_USD"}.issubset(fdf.columns):
+            return None
+        return px.bar(ranked_by_country(fdf, "Exchange_Rate_USD", ("Currency_Code",)), x="Currency_Code", y="Exchange_Rate_USD", color="Country")
+
+    def bar_fx_ytd():
+        if not {"Country", "Currency_Code", "Currency_Change_YTD_Percent"}.issubset(fdf.columns):
+            return None
+        agg = aggregate_by_country(fdf, ("Currency_Change_YTD_Percent",), ("Currency_Code",))
+        return px.bar(
+            agg,
             x="Currency_Code",
             y="Currency_Change_YTD_Percent",
-            color=(fdf["Currency_Change_YTD_Percent"] >= 0).map({True: "Up", False: "Down"}),
+            color=np.where(agg["Currency_Change_YTD_Percent"].to_numpy() >= 0, "Up", "Down"),
             color_discrete_map={"Up": "#2ca02c", "Down": "#d62728"},
         )
-        divs["bar_fx_ytd"] = _plot_div(fig)
 
-    if {"Oil_Price_USD_Barrel", "Commodity_Index", "Country"}.issubset(fdf.columns):
-        fig = px.scatter(fdf, x="Commodity_Index", y="Oil_Price_USD_Barrel", color="Country")
-        divs["scatter_oil"] = _plot_div(fig)
+    def scatter_oil():
+        if not {"Oil_Price_USD_Barrel", "Commodity_Index", "Country"}.issubset(fdf.columns):
+            return None
+        return _scatter(fdf, x="Commodity_Index", y="Oil_Price_USD_Barrel", color="Country")
 
-    if {"Gold_Price_USD_Ounce", "Country"}.issubset(fdf.columns):
-        fig = px.violin(fdf, y="Gold_Price_USD_Ounce", color="Country", box=True, points=False)
-        divs["violin_gold"] = _plot_div(fig)
+    def violin_gold():
+        if not {"Gold_Price_USD_Ounce", "Country"}.issubset(fdf.columns):
+            return None
+        return px.violin(fdf, y="Gold_Price_USD_Ounce", color="Country", box=True, points=False)
 
-    cols = [c for c in ["Exchange_Rate_USD", "Currency_Change_YTD_Percent"] if c in fdf.columns]
-    if len(cols) == 2:
+    def heatmap_fx():
+        cols = [c for c in ["Exchange_Rate_USD", "Currency_Change_YTD_Percent"] if c in fdf.columns]
+        if len(cols) != 2:
+            return None
         corr = fdf[cols].corr(numeric_only=True)
-        fig = ff.create_annotated_heatmap(z=corr.values.round(2), x=cols, y=cols, colorscale="Blues", showscale=True)
-        divs["heatmap_fx"] = _plot_div(fig)
-
-    if {"Commodity_Index", "Inflation_Rate_Percent", "Country"}.issubset(fdf.columns):
-        fig = px.scatter(fdf, x="Commodity_Index", y="Inflation_Rate_Percent", color="Country", trendline="ols")
-        divs["scatter_comm_infl"] = _plot_div(fig)
+        return annotated_heatmap(corr.to_numpy(dtype=np.float32).round(2), cols, "Blues")
+
+    def scatter_comm_infl():
+        if not {"Commodity_Index", "Inflation_Rate_Percent", "Country"}.issubset(fdf.columns):
+            return None
+        fig = _scatter(fdf, x="Commodity_Index", y="Inflation_Rate_Percent", color="Country")
+        return add_trendlines(fig, ols_lines(fdf, "Commodity_Index", "Inflation_Rate_Percent", "Country"))
+
+    divs = _render_divs(
+        "fx_and_commodities",
+        filters,
+        {
+            "bar_fx_level": bar_fx_level,
+            "bar_fx_ytd": bar_fx_ytd,
+            "scatter_oil": scatter_oil,
+            "violin_gold": violin_gold,
+            "heatmap_fx": heatmap_fx,
+            "scatter_comm_infl": scatter_comm_infl,
+        },
+    )
 
     return render_template(
         "fx_and_commodities.html",
@@ -267,40 +390,44 @@ def fx_and_commodities():
     )
 
 
+_PREDICTION_STATE: Optional[tuple] = None
+_PREDICTION_LOCK = threading.Lock()
+
+
+def _prediction_state() -> Optional[Tuple[pd.DataFrame, np.ndarray, np.ndarray]]:
+    # Rebuilt only when the data file changes; the lock stops concurrent requests building it twice
+    global _PREDICTION_STATE
+    data_version = os.path.getmtime(DATA_PATH)
+    with _PREDICTION_LOCK:
+        if _PREDICTION_STATE is None or _PREDICTION_STATE[0] != data_version:
+            df = load_data(DATA_PATH)
+            state = build_prediction_state(df) if {"Country", "Date"}.issubset(df.columns) else None
+            _PREDICTION_STATE = (data_version, state)
+        return _PREDICTION_STATE[1]
+
+
 @app.route("/prediction")
 def prediction():
     # Country similarity recommendation (ported)
-    df = load_data(DATA_PATH)
-    if not {"Country", "Date"}.issubset(df.columns):
+    state = _prediction_state()
+    if state is None:
         return render_template("prediction.html", error="Country or Date column missing in data.")
 
-    feature_cols = ["GDP_Growth_Rate_Percent", "Inflation_Rate_Percent"]
-    if "Credit_Rating" in df.columns:
-        credit_ratings_sorted = sorted(df["Credit_Rating"].dropna().unique(), reverse=True)
-        credit_map = {k: v for v, k in enumerate(credit_ratings_sorted)}
-        df["Credit_Rating_Num"] = df["Credit_Rating"].map(credit_map)
-        feature_cols.append("Credit_Rating_Num")
-    else:
-        df["Credit_Rating_Num"] = 0
-        feature_cols.append("Credit_Rating_Num")
-
-    latest_df = df.sort_values("Date").groupby("Country").tail(1).reset_index(drop=True)
+    latest_df, features, norms = state
     country = request.args.get("country") or (latest_df["Country"].iloc[0] if len(latest_df) else None)
 
     recs_table_html = None
-    if country:
-        from sklearn.preprocessing import MinMaxScaler
-        from sklearn.metrics.pairwise import cosine_similarity
-
-        selected = latest_df[latest_df["Country"] == country][feature_cols].values
-        scaler = MinMaxScaler()
-        features_scaled = scaler.fit_transform(latest_df[feature_cols])
-        sim = cosine_similarity(selected, features_scaled)[0]
-        latest_df = latest_df.copy()
-        latest_df["Similarity"] = sim
-        recs = latest_df[latest_df["Country"] != country].sort_values("Similarity", ascending=False).head(5)
-        recs_table_html = recs[["Country", "GDP_Growth_Rate_Percent", "Inflation_Rate_Percent", "Credit_Rating", "Similarity"]].to_html(
-            classes="table table-sm table-striped", index=False, float_format=lambda x: f"{x:.2f}" if isinstance(x, float) else x
+    matches = np.flatnonzero(latest_df["Country"].to_numpy() == country) if country else []
+    if len(matches):
+        idx = matches[0]
+        sim = features @ features[idx] / (norms * norms[idx])
+        recs = latest_df.assign(Similarity=sim).drop(index=idx).sort_values("Similarity", ascending=False).head(5)
+        recs_table_html = (
+            recs[["Country", "GDP_Growth_Rate_Percent", "Inflation_Rate_Percent", "Credit_Rating", "Similarity"]]
+            .style.format({col: "{:.2f}" for col in ["GDP_Growth_Rate_Percent", "Inflation_Rate_Percent", "Similarity"]})
+            .hide(axis="index")
+            .set_table_attributes('class="table table-sm table-striped"')
+            .to_html()
         )
 
     return render_template("prediction.html", countries=sorted(latest_df["Country"].unique().tolist()), selected_country=country, recs_table_html=recs_table_html)
@@ -1,49 +1,203 @@
 import os
-from typing import List, Optional
+import tempfile
+import threading
+from functools import lru_cache, wraps
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 
+from utils import common
 
-def load_data(csv_path: str) -> pd.DataFrame:
+
+def convert_to_parquet(csv_path: str) -> str:
     if not os.path.exists(csv_path):
         raise FileNotFoundError(f"CSV not found at: {csv_path}")
-    df = pd.read_csv(csv_path)
-    if "Date" in df.columns:
+    parquet_path = str(Path(csv_path).with_suffix(".parquet"))
+    # One-time conversion; only redone when the CSV is newer than the Parquet copy
+    if os.path.exists(parquet_path) and os.path.getmtime(parquet_path) >= os.path.getmtime(csv_path):
+        return parquet_path
+    table = pacsv.read_csv(csv_path)
+    if "Date" in table.column_names:
+        # Unparseable dates become null, as in the baseline, so the column is always a timestamp
+        dates = pd.to_datetime(table["Date"].to_pandas(), errors="coerce")
+        table = table.set_column(table.column_names.index("Date"), "Date", pa.array(dates, type=pa.timestamp("ns")))
+    # Renamed into place so concurrent readers never see a half-written file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(parquet_path) or ".", suffix=".parquet.tmp")
+    os.close(fd)
+    try:
+        pq.write_table(table, tmp_path, compression="zstd", row_group_size=65536)
+        os.replace(tmp_path, parquet_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return parquet_path
+
+
+@lru_cache(maxsize=2)
+def _dataset(parquet_path: str, mtime: float) -> ds.Dataset:
+    # Opened once per file version; discovery and schema/metadata parsing are not repeated per read
+    return ds.dataset(parquet_path, format="parquet")
+
+
+_FILTER_OPS = {
+    "in": lambda field, value: field.isin(list(value)),
+    ">=": lambda field, value: field >= value,
+    "<=": lambda field, value: field <= value,
+}
+
+
+def _filters_to_expression(filters: Optional[Tuple[tuple, ...]]) -> Optional[pc.Expression]:
+    expression = None
+    for column, op, value in filters or ():
+        term = _FILTER_OPS[op](pc.field(column), value)
+        expression = term if expression is None else expression & term
+    return expression
+
+
+@lru_cache(maxsize=32)
+def _read_parquet(parquet_path: str, mtime: float, columns: Optional[Tuple[str, ...]], filters: Optional[Tuple[tuple, ...]]) -> pd.DataFrame:
+    # The filter is evaluated during the scan, so row groups whose statistics rule it out are skipped
+    table = _dataset(parquet_path, mtime).to_table(
+        columns=list(columns) if columns else None,
+        filter=_filters_to_expression(filters),
+    )
+    df = table.to_pandas()
+    if "Date" in df.columns and not pd.api.types.is_datetime64_any_dtype(df["Date"]):
         df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
+    return _downcast(df)
+
+
+CATEGORICAL_COLUMNS = ["Country", "Credit_Rating", "Currency_Code", "Stock_Index"]
+
+
+def _downcast(df: pd.DataFrame) -> pd.DataFrame:
+    # float32 keeps the ~6 significant digits these columns carry at half the bytes
+    for col in df.select_dtypes("float64").columns:
+        df[col] = df[col].astype("float32")
+    for col in df.select_dtypes("int64").columns:
+        df[col] = pd.to_numeric(df[col], downcast="integer")
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
     return df
 
 
-def apply_common_filters(
-    df: pd.DataFrame,
+def load_data(
+    csv_path: str,
+    columns: Optional[List[str]] = None,
+    filters: Optional[Tuple[tuple, ...]] = None,
+) -> pd.DataFrame:
+    # Cached frames are shared between callers (keyed on the file mtime); do not mutate them
+    parquet_path = convert_to_parquet(csv_path)
+    return _read_parquet(parquet_path, os.path.getmtime(parquet_path), tuple(columns) if columns else None, filters)
+
+
+def build_parquet_filters(
     country_options: Optional[List[str]] = None,
     credit_ratings: Optional[List[str]] = None,
     dates: Optional[List[pd.Timestamp]] = None,
-) -> pd.DataFrame:
-    filtered = df.copy()
+    extra_filters: Optional[Dict[str, List]] = None,
+) -> Optional[Tuple[tuple, ...]]:
+    # Parquet predicates, so row groups without matching rows are skipped at read time
+    filters = []
 
     if country_options:
-        filtered = filtered[filtered["Country"].isin(country_options)]
+        filters.append(("Country", "in", tuple(country_options)))
 
     if credit_ratings:
-        filtered = filtered[filtered["Credit_Rating"].isin(credit_ratings)]
+        filters.append(("Credit_Rating", "in", tuple(credit_ratings)))
 
     if dates:
         if len(dates) == 2 and dates[0] is not None and dates[1] is not None:
             start, end = dates
-            filtered = filtered[(filtered["Date"] >= start) & (filtered["Date"] <= end)]
+            filters.append(("Date", ">=", pd.Timestamp(start)))
+            filters.append(("Date", "<=", pd.Timestamp(end)))
         else:
-            filtered = filtered[filtered["Date"].isin(dates)]
+            filters.append(("Date", "in", tuple(pd.Timestamp(d) for d in dates)))
 
-    return filtered
+    for column, values in (extra_filters or {}).items():
+        if values:
+            filters.append((column, "in", tuple(values)))
 
+    return tuple(filters) or None
 
+
+def _memoize_per_frame(maxsize: int):
+    # load_data shares one frame per file version and filter set, so id(df) is a stable key
+    def decorator(func):
+        cache: dict = {}
+        lock = threading.Lock()
+
+        @wraps(func)
+        def wrapper(df: pd.DataFrame, *args):
+            key = (id(df), args)
+            with lock:
+                cached = cache.get(key)
+            if cached is not None and cached[0] is df:
+                return cached[1]
+            result = func(df, *args)
+            with lock:
+                if key not in cache and len(cache) >= maxsize:
+                    cache.pop(next(iter(cache)))
+                cache[key] = (df, result)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+aggregate_by_country = _memoize_per_frame(maxsize=64)(common.aggregate_by_country)
+ranked_by_country = _memoize_per_frame(maxsize=64)(common.ranked_by_country)
+ols_lines = _memoize_per_frame(maxsize=64)(common.ols_lines)
+correlation_matrix = _memoize_per_frame(maxsize=64)(common.correlation_matrix)
+rasterize_points = _memoize_per_frame(maxsize=16)(common.rasterize_points)
+
+
+PREDICTION_FEATURES = ["GDP_Growth_Rate_Percent", "Inflation_Rate_Percent", "Credit_Rating_Num"]
+
+
+def build_prediction_state(df: pd.DataFrame) -> Tuple[pd.DataFrame, np.ndarray, np.ndarray]:
+    # Latest rows, scaled features and norms, so a query is one matrix-vector product
+    if "Credit_Rating" in df.columns:
+        credit_ratings_sorted = sorted(df["Credit_Rating"].dropna().unique(), reverse=True)
+        credit_map = {k: v for v, k in enumerate(credit_ratings_sorted)}
+        credit_num = df["Credit_Rating"].map(credit_map).astype("float32")
+    else:
+        credit_num = 0
+
+    latest_df = common.latest_by_country(df.assign(Credit_Rating_Num=credit_num))
+    # Min-max scaling in one NumPy pass (same result as sklearn's MinMaxScaler, constant columns map to 0)
+    values = latest_df[PREDICTION_FEATURES].to_numpy(dtype=np.float32)
+    lo = np.nanmin(values, axis=0)
+    features = (values - lo) / (np.nanmax(values, axis=0) - lo + np.float32(1e-12))
+    norms = np.linalg.norm(features, axis=1)
+    norms[norms == 0] = 1.0
+    return latest_df, features, norms
+
+
+def _distinct(df: pd.DataFrame, col: str) -> list:
+    if col not in df.columns:
+        return []
+    # Categorical columns already carry their distinct values; no need to scan the rows
+    if isinstance(df[col].dtype, pd.CategoricalDtype):
+        return sorted(df[col].cat.categories.tolist())
+    return sorted(df[col].dropna().unique().tolist())
+
+
+@_memoize_per_frame(maxsize=4)
 def get_distinct_values(df: pd.DataFrame) -> dict:
     return {
-        "countries": sorted(df["Country"].dropna().unique().tolist()) if "Country" in df.columns else [],
-        "credit_ratings": sorted(df["Credit_Rating"].dropna().unique().tolist()) if "Credit_Rating" in df.columns else [],
-        "dates": sorted(df["Date"].dropna().unique().tolist()) if "Date" in df.columns else [],
-        "currencies": sorted(df["Currency_Code"].dropna().unique().tolist()) if "Currency_Code" in df.columns else [],
-        "stock_indices": sorted(df["Stock_Index"].dropna().unique().tolist()) if "Stock_Index" in df.columns else [],
+        "countries": _distinct(df, "Country"),
+        "credit_ratings": _distinct(df, "Credit_Rating"),
+        "dates": _distinct(df, "Date"),
+        "currencies": _distinct(df, "Currency_Code"),
+        "stock_indices": _distinct(df, "Stock_Index"),
     }
-
-
@@ -1,12 +1,12 @@
 from pathlib import Path
 
-import pandas as pd
+import numpy as np
 import plotly.express as px
-import plotly.figure_factory as ff
-import plotly.graph_objects as go
 import streamlit as st
 
-from utils.data import load_data, apply_common_filters, get_distinct_values
+from utils.common import annotated_heatmap
+from utils.data import aggregate_by_country, correlation_matrix, filter_key, filtered_data, ranked_by_country
+from utils.ui import sidebar_filters
 
 
 st.set_page_config(page_title="Equity Markets", page_icon="📈", layout="wide")
@@ -14,37 +14,22 @@ st.set_page_config(page_title="Equity Markets", page_icon="📈", layout="wide")
 DATA_PATH = str(Path(__file__).resolve().parents[1] / "Global finance data.csv")
 
 
-def sidebar_filters(df: pd.DataFrame):
-    meta = get_distinct_values(df)
-    st.sidebar.markdown("### Page Filters")
-    countries = st.sidebar.multiselect("Country", options=meta["countries"], default=meta["countries"])
-    indices = st.sidebar.multiselect("Stock Index", options=meta["stock_indices"], default=meta["stock_indices"])
-    ratings = st.sidebar.multiselect("Credit Rating", options=meta["credit_ratings"], default=meta["credit_ratings"])
-    date_values = meta["dates"]
-    date_filter = None
-    if date_values:
-        min_date, max_date = min(date_values), max(date_values)
-        date_range = st.sidebar.date_input("Date range", value=(min_date, max_date))
-        if isinstance(date_range, tuple) and len(date_range) == 2:
-            date_filter = [pd.to_datetime(date_range[0]), pd.to_datetime(date_range[1])]
-    return countries, indices, ratings, date_filter
-
-
 def main():
     st.title("Equity Markets Analysis")
-    df = load_data(DATA_PATH)
-    countries, indices, ratings, date_filter = sidebar_filters(df)
-    fdf = apply_common_filters(df, countries, ratings, date_filter)
-    if indices:
-        fdf = fdf[fdf["Stock_Index"].isin(indices)]
-
+    countries, ratings, date_filter, extra_filters = sidebar_filters(DATA_PATH, include_index=True)
+    key = filter_key(countries, ratings, date_filter, extra_filters)
+    fdf = filtered_data(DATA_PATH, key)
+
+    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(
+        ["Index Value by Country", "Daily Change (%) by Country", "Market Cap vs Index Value", "Market Cap Treemap", "Index Value Distribution", "Equity Metrics Correlation"],
+        key="equity_tabs",
+        on_change="rerun",
+    )
     # 1. Bar: Index Value by Country
-    col1, col2 = st.columns(2)
-    with col1:
-        st.subheader("Index Value by Country")
-        if {"Country", "Index_Value"}.issubset(fdf.columns):
+    with tab1:
+        if tab1.open and {"Country", "Stock_Index", "Index_Value"}.issubset(fdf.columns):
             fig = px.bar(
-                fdf.sort_values("Index_Value", ascending=False),
+                ranked_by_country(DATA_PATH, key, "Index_Value", ("Stock_Index",)),
                 x="Country",
                 y="Index_Value",
                 color="Index_Value",
@@ -56,14 +41,14 @@ def main():
             st.markdown("**Conclusion**: Do not judge by level alone; check changes and valuations.")
 
     # 2. Bar: Daily Change (%) by Country with color sign
-    with col2:
-        st.subheader("Daily Change (%) by Country")
-        if {"Country", "Daily_Change_Percent"}.issubset(fdf.columns):
+    with tab2:
+        if tab2.open and {"Country", "Daily_Change_Percent"}.issubset(fdf.columns):
+            agg = aggregate_by_country(DATA_PATH, key, ("Daily_Change_Percent",))
             fig = px.bar(
-                fdf,
+                agg,
                 x="Country",
                 y="Daily_Change_Percent",
-                color=(fdf["Daily_Change_Percent"] >= 0).map({True: "Gain", False: "Loss"}),
+                color=np.where(agg["Daily_Change_Percent"].to_numpy() >= 0, "Gain", "Loss"),
                 color_discrete_map={"Gain": "#2ca02c", "Loss": "#d62728"},
             )
             st.plotly_chart(fig, use_container_width=True)
@@ -71,11 +56,9 @@ def main():
             st.markdown("**Conclusion**: Daily moves are short term; also check fundamentals.")
 
     # 3. Scatter: Market Cap vs Index Value sized by Daily Change
-    col3, col4 = st.columns(2)
-    with col3:
-        st.subheader("Market Cap vs Index Value")
+    with tab3:
         needed = {"Market_Cap_Trillion_USD", "Index_Value", "Daily_Change_Percent", "Country"}
-        if needed.issubset(fdf.columns):
+        if tab3.open and needed.issubset(fdf.columns):
             fig = px.scatter(
                 fdf,
                 x="Index_Value",
@@ -89,9 +72,8 @@ def main():
             st.markdown("**Conclusion**: Big size does not guarantee low risk; use data to decide.")
 
     # 4. Treemap: Market Cap by Country and Index
-    with col4:
-        st.subheader("Market Cap Treemap")
-        if {"Country", "Stock_Index", "Market_Cap_Trillion_USD"}.issubset(fdf.columns):
+    with tab4:
+        if tab4.open and {"Country", "Stock_Index", "Market_Cap_Trillion_USD"}.issubset(fdf.columns):
             fig = px.treemap(
                 fdf,
                 path=["Country", "Stock_Index"],
@@ -104,18 +86,15 @@ def main():
             st.markdown("**Conclusion**: Do not stick to only a few big areas; diversify.")
 
     # 5. Box: Distribution of Index Values
-    col5, col6 = st.columns(2)
-    with col5:
-        st.subheader("Index Value Distribution")
-        if {"Index_Value"}.issubset(fdf.columns):
+    with tab5:
+        if tab5.open and {"Index_Value"}.issubset(fdf.columns):
             fig = px.box(fdf, y="Index_Value", points="suspectedoutliers")
             st.plotly_chart(fig, use_container_width=True)
             st.markdown("**Insights**: This shows the middle level and which points are far from the rest.")
             st.markdown("**Conclusion**: Treat extreme values carefully; do not compare them directly.")
 
     # 6. Heatmap: Correlation between equity metrics
-    with col6:
-        st.subheader("Equity Metrics Correlation")
+    with tab6:
         equity_cols = [
             c
             for c in [
@@ -127,16 +106,9 @@ def main():
             ]
             if c in fdf.columns
         ]
-        if len(equity_cols) >= 2:
-            corr = fdf[equity_cols].corr(numeric_only=True)
-            fig = ff.create_annotated_heatmap(
-                z=corr.values.round(2),
-                x=equity_cols,
-                y=equity_cols,
-                colorscale="RdBu",
-                showscale=True,
-                reversescale=True,
-            )
+        if tab6.open and len(equity_cols) >= 2:
+            corr = correlation_matrix(DATA_PATH, key, tuple(equity_cols))
+            fig = annotated_heatmap(corr, equity_cols, "RdBu", reversescale=True)
             fig.update_layout(margin=dict(l=10, r=10, t=30, b=10))
             st.plotly_chart(fig, use_container_width=True)
             st.markdown("**Insights**: This highlights which numbers move together across countries.")
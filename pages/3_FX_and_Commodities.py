@@ -1,11 +1,12 @@
 from pathlib import Path
 
-import pandas as pd
+import numpy as np
 import plotly.express as px
-import plotly.figure_factory as ff
 import streamlit as st
 
-from utils.data import load_data, apply_common_filters, get_distinct_values
+from utils.common import add_trendlines, annotated_heatmap
+from utils.data import correlation_matrix, downsampled, filter_key, filtered_data, ols_lines, sorted_by
+from utils.ui import sidebar_filters
 
 
 st.set_page_config(page_title="FX & Commodities", page_icon="💱", layout="wide")
@@ -13,37 +14,22 @@ st.set_page_config(page_title="FX & Commodities", page_icon="💱", layout="wide
 DATA_PATH = str(Path(__file__).resolve().parents[1] / "Global finance data.csv")
 
 
-def sidebar_filters(df: pd.DataFrame):
-    meta = get_distinct_values(df)
-    st.sidebar.markdown("### Page Filters")
-    countries = st.sidebar.multiselect("Country", options=meta["countries"], default=meta["countries"])
-    currencies = st.sidebar.multiselect("Currency", options=meta["currencies"], default=meta["currencies"])
-    ratings = st.sidebar.multiselect("Credit Rating", options=meta["credit_ratings"], default=meta["credit_ratings"])
-    date_values = meta["dates"]
-    date_filter = None
-    if date_values:
-        min_date, max_date = min(date_values), max(date_values)
-        date_range = st.sidebar.date_input("Date range", value=(min_date, max_date))
-        if isinstance(date_range, tuple) and len(date_range) == 2:
-            date_filter = [pd.to_datetime(date_range[0]), pd.to_datetime(date_range[1])]
-    return countries, currencies, ratings, date_filter
-
-
 def main():
     st.title("FX & Commodities Analysis")
-    df = load_data(DATA_PATH)
-    countries, currencies, ratings, date_filter = sidebar_filters(df)
-    fdf = apply_common_filters(df, countries, ratings, date_filter)
-    if currencies:
-        fdf = fdf[fdf["Currency_Code"].isin(currencies)]
-
-    col1, col2 = st.columns(2)
-    with col1:
-        st.subheader("Exchange Rate vs USD")
+    countries, ratings, date_filter, extra_filters = sidebar_filters(DATA_PATH, include_currency=True)
+    key = filter_key(countries, ratings, date_filter, extra_filters)
+    fdf = filtered_data(DATA_PATH, key)
+
+    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(
+        ["Exchange Rate vs USD", "Currency Change YTD (%)", "Oil Price vs Commodity Index", "Gold Price (USD/Oz) by Country", "FX Heatmap: Rate & YTD Change", "Commodity vs Macro: Inflation"],
+        key="fx_tabs",
+        on_change="rerun",
+    )
+    with tab1:
         needed = {"Country", "Currency_Code", "Exchange_Rate_USD"}
-        if needed.issubset(fdf.columns):
+        if tab1.open and needed.issubset(fdf.columns):
             fig = px.bar(
-                fdf.sort_values("Exchange_Rate_USD", ascending=False),
+                sorted_by(DATA_PATH, key, "Exchange_Rate_USD"),
                 x="Currency_Code",
                 y="Exchange_Rate_USD",
                 color="Country",
@@ -52,27 +38,24 @@ def main():
             st.markdown("**Insights**: A higher number means the local currency is weaker versus USD.")
             st.markdown("**Conclusion**: Currency moves change import costs; keep an eye on it.")
 
-    with col2:
-        st.subheader("Currency Change YTD (%)")
-        if {"Currency_Code", "Currency_Change_YTD_Percent"}.issubset(fdf.columns):
+    with tab2:
+        if tab2.open and {"Currency_Code", "Currency_Change_YTD_Percent"}.issubset(fdf.columns):
             fig = px.bar(
                 fdf,
                 x="Currency_Code",
                 y="Currency_Change_YTD_Percent",
-                color=(fdf["Currency_Change_YTD_Percent"] >= 0).map({True: "Up", False: "Down"}),
+                color=np.where(fdf["Currency_Change_YTD_Percent"].to_numpy() >= 0, "Up", "Down"),
                 color_discrete_map={"Up": "#2ca02c", "Down": "#d62728"},
             )
             st.plotly_chart(fig, use_container_width=True)
             st.markdown("**Insights**: Some currencies strengthened this year, others weakened.")
             st.markdown("**Conclusion**: Consider currency effects when investing internationally.")
 
-    col3, col4 = st.columns(2)
-    with col3:
-        st.subheader("Oil Price vs Commodity Index")
+    with tab3:
         needed = {"Oil_Price_USD_Barrel", "Commodity_Index", "Country"}
-        if needed.issubset(fdf.columns):
+        if tab3.open and needed.issubset(fdf.columns):
             fig = px.scatter(
-                fdf,
+                downsampled(DATA_PATH, key, "Commodity_Index", "Oil_Price_USD_Barrel"),
                 x="Commodity_Index",
                 y="Oil_Price_USD_Barrel",
                 color="Country",
@@ -81,37 +64,32 @@ def main():
             st.markdown("**Insights**: Oil prices often move with broader commodities.")
             st.markdown("**Conclusion**: Do not rely only on oil; keep a mix.")
 
-    with col4:
-        st.subheader("Gold Price (USD/Oz) by Country")
+    with tab4:
         needed = {"Gold_Price_USD_Ounce", "Country"}
-        if needed.issubset(fdf.columns):
+        if tab4.open and needed.issubset(fdf.columns):
             fig = px.violin(fdf, y="Gold_Price_USD_Ounce", color="Country", box=True, points=False)
             st.plotly_chart(fig, use_container_width=True)
             st.markdown("**Insights**: Gold prices are mostly similar; sometimes they differ.")
             st.markdown("**Conclusion**: Gold can add stability to a portfolio.")
 
-    col5, col6 = st.columns(2)
-    with col5:
-        st.subheader("FX Heatmap: Rate & YTD Change")
+    with tab5:
         cols = [c for c in ["Exchange_Rate_USD", "Currency_Change_YTD_Percent"] if c in fdf.columns]
-        if len(cols) == 2:
-            corr = fdf[cols].corr(numeric_only=True)
-            fig = ff.create_annotated_heatmap(z=corr.values.round(2), x=cols, y=cols, colorscale="Blues", showscale=True)
+        if tab5.open and len(cols) == 2:
+            fig = annotated_heatmap(correlation_matrix(DATA_PATH, key, tuple(cols)), cols, "Blues")
             st.plotly_chart(fig, use_container_width=True)
             st.markdown("**Insights**: FX level and yearly change are related, but not perfectly.")
             st.markdown("**Conclusion**: Look at both to form a currency view.")
 
-    with col6:
-        st.subheader("Commodity vs Macro: Inflation")
+    with tab6:
         needed = {"Commodity_Index", "Inflation_Rate_Percent"}
-        if needed.issubset(fdf.columns):
+        if tab6.open and needed.issubset(fdf.columns):
             fig = px.scatter(
-                fdf,
+                downsampled(DATA_PATH, key, "Commodity_Index", "Inflation_Rate_Percent"),
                 x="Commodity_Index",
                 y="Inflation_Rate_Percent",
                 color="Country",
-                trendline="ols",
             )
+            add_trendlines(fig, ols_lines(DATA_PATH, key, "Commodity_Index", "Inflation_Rate_Percent", "Country"))
             st.plotly_chart(fig, use_container_width=True)
             st.markdown("**Insights**: When commodities get expensive, inflation can rise.")
             st.markdown("**Conclusion**: Watch prices and policies in such times.")
@@ -1,11 +1,12 @@
 from pathlib import Path
 
-import pandas as pd
 import plotly.express as px
-import plotly.figure_factory as ff
 import streamlit as st
 
-from utils.data import load_data, apply_common_filters, get_distinct_values
+from utils.charts import country_bar
+from utils.common import add_trendlines
+from utils.data import downsampled, filter_key, filtered_data, ols_lines
+from utils.ui import sidebar_filters
 
 
 st.set_page_config(page_title="Fixed Income & Credit", page_icon="💵", layout="wide")
@@ -13,64 +14,43 @@ st.set_page_config(page_title="Fixed Income & Credit", page_icon="💵", layout=
 DATA_PATH = str(Path(__file__).resolve().parents[1] / "Global finance data.csv")
 
 
-def sidebar_filters(df: pd.DataFrame):
-    meta = get_distinct_values(df)
-    st.sidebar.markdown("### Page Filters")
-    countries = st.sidebar.multiselect("Country", options=meta["countries"], default=meta["countries"])
-    ratings = st.sidebar.multiselect("Credit Rating", options=meta["credit_ratings"], default=meta["credit_ratings"])
-    date_values = meta["dates"]
-    date_filter = None
-    if date_values:
-        min_date, max_date = min(date_values), max(date_values)
-        date_range = st.sidebar.date_input("Date range", value=(min_date, max_date))
-        if isinstance(date_range, tuple) and len(date_range) == 2:
-            date_filter = [pd.to_datetime(date_range[0]), pd.to_datetime(date_range[1])]
-    return countries, ratings, date_filter
-
-
 def main():
     st.title("Fixed Income & Credit Analysis")
-    df = load_data(DATA_PATH)
-    countries, ratings, date_filter = sidebar_filters(df)
-    fdf = apply_common_filters(df, countries, ratings, date_filter)
-
-    col1, col2 = st.columns(2)
-    with col1:
-        st.subheader("10Y Bond Yield (%) by Country")
-        if {"Country", "Bond_Yield_10Y_Percent"}.issubset(fdf.columns):
-            fig = px.bar(
-                fdf.sort_values("Bond_Yield_10Y_Percent", ascending=False),
-                x="Country",
-                y="Bond_Yield_10Y_Percent",
-                color="Bond_Yield_10Y_Percent",
-                color_continuous_scale="Inferno",
-            )
+    countries, ratings, date_filter, extra_filters = sidebar_filters(DATA_PATH)
+    key = filter_key(countries, ratings, date_filter, extra_filters)
+    fdf = filtered_data(DATA_PATH, key)
+
+    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(
+        ["10Y Bond Yield (%) by Country", "Bond Yield vs Inflation", "Yield vs Policy Rate", "Credit Rating Distribution", "Debt-to-GDP vs Yield", "Political Risk vs Yield"],
+        key="fixed_income_tabs",
+        on_change="rerun",
+    )
+    with tab1:
+        if tab1.open and {"Country", "Bond_Yield_10Y_Percent"}.issubset(fdf.columns):
+            fig = country_bar(DATA_PATH, key, "Bond_Yield_10Y_Percent", "Inferno")
             st.plotly_chart(fig, use_container_width=True)
             st.markdown("**Insights**: Higher yield often reflects higher inflation or risk.")
             st.markdown("**Conclusion**: Each country’s yield shows a different risk/return mix.")
 
-    with col2:
-        st.subheader("Bond Yield vs Inflation")
+    with tab2:
         needed = {"Bond_Yield_10Y_Percent", "Inflation_Rate_Percent", "Country"}
-        if needed.issubset(fdf.columns):
+        if tab2.open and needed.issubset(fdf.columns):
             fig = px.scatter(
-                fdf,
+                downsampled(DATA_PATH, key, "Inflation_Rate_Percent", "Bond_Yield_10Y_Percent"),
                 x="Inflation_Rate_Percent",
                 y="Bond_Yield_10Y_Percent",
                 color="Country",
-                trendline="ols",
             )
+            add_trendlines(fig, ols_lines(DATA_PATH, key, "Inflation_Rate_Percent", "Bond_Yield_10Y_Percent", "Country"))
             st.plotly_chart(fig, use_container_width=True)
             st.markdown("**Insights**: Where inflation is higher, yields are often higher.")
             st.markdown("**Conclusion**: Long-term bonds fit better where inflation is stable.")
 
-    col3, col4 = st.columns(2)
-    with col3:
-        st.subheader("Yield vs Policy Rate")
+    with tab3:
         needed = {"Bond_Yield_10Y_Percent", "Interest_Rate_Percent", "Country"}
-        if needed.issubset(fdf.columns):
+        if tab3.open and needed.issubset(fdf.columns):
             fig = px.scatter(
-                fdf,
+                downsampled(DATA_PATH, key, "Interest_Rate_Percent", "Bond_Yield_10Y_Percent"),
                 x="Interest_Rate_Percent",
                 y="Bond_Yield_10Y_Percent",
                 color="Country",
@@ -79,36 +59,32 @@ def main():
             st.markdown("**Insights**: Policy rate changes affect yields, but not exactly the same amount.")
             st.markdown("**Conclusion**: Watch central bank guidance.")
 
-    with col4:
-        st.subheader("Credit Rating Distribution")
-        if {"Credit_Rating"}.issubset(fdf.columns):
+    with tab4:
+        if tab4.open and {"Credit_Rating"}.issubset(fdf.columns):
             fig = px.histogram(fdf, x="Credit_Rating", color="Credit_Rating")
             st.plotly_chart(fig, use_container_width=True)
             st.markdown("**Insights**: Many countries are in investment-grade ratings.")
             st.markdown("**Conclusion**: Ratings can fall; stay updated.")
 
-    col5, col6 = st.columns(2)
-    with col5:
-        st.subheader("Debt-to-GDP vs Yield")
+    with tab5:
         needed = {"Government_Debt_GDP_Percent", "Bond_Yield_10Y_Percent", "Country"}
-        if needed.issubset(fdf.columns):
+        if tab5.open and needed.issubset(fdf.columns):
             fig = px.scatter(
-                fdf,
+                downsampled(DATA_PATH, key, "Government_Debt_GDP_Percent", "Bond_Yield_10Y_Percent"),
                 x="Government_Debt_GDP_Percent",
                 y="Bond_Yield_10Y_Percent",
                 color="Country",
-                trendline="ols",
             )
+            add_trendlines(fig, ols_lines(DATA_PATH, key, "Government_Debt_GDP_Percent", "Bond_Yield_10Y_Percent", "Country"))
             st.plotly_chart(fig, use_container_width=True)
             st.markdown("**Insights**: Countries with more debt often pay higher yields.")
             st.markdown("**Conclusion**: Managing debt is key for steady long-term returns.")
 
-    with col6:
-        st.subheader("Political Risk vs Yield")
+    with tab6:
         needed = {"Political_Risk_Score", "Bond_Yield_10Y_Percent", "Country"}
-        if needed.issubset(fdf.columns):
+        if tab6.open and needed.issubset(fdf.columns):
             fig = px.scatter(
-                fdf,
+                downsampled(DATA_PATH, key, "Political_Risk_Score", "Bond_Yield_10Y_Percent"),
                 x="Political_Risk_Score",
                 y="Bond_Yield_10Y_Percent",
                 color="Country",
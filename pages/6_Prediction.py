@@ -1,9 +1,37 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
-from utils.data import load_data
+from utils.data import latest_by_country, load_data
 from pathlib import Path
-from sklearn.preprocessing import MinMaxScaler
-from sklearn.metrics.pairwise import cosine_similarity
+
+
+FEATURE_COLS = ["GDP_Growth_Rate_Percent", "Inflation_Rate_Percent", "Credit_Rating_Num"]
+
+
+@st.cache_resource(show_spinner=False)
+def similarity_index(csv_path: str):
+    # Built once per process and shared, not copied, across reruns (read-only); None without Country/Date
+    df = load_data(csv_path)
+    if not {"Country", "Date"}.issubset(df.columns):
+        return None
+    latest_df = latest_by_country(csv_path)
+    # Convert credit rating to numeric for similarity
+    if "Credit_Rating" in df.columns:
+        credit_ratings_sorted = sorted(df["Credit_Rating"].dropna().unique(), reverse=True)
+        credit_map = {k: v for v, k in enumerate(credit_ratings_sorted)}
+        latest_df = latest_df.assign(Credit_Rating_Num=latest_df["Credit_Rating"].map(credit_map))
+    else:
+        latest_df = latest_df.assign(Credit_Rating_Num=0)
+    # Each feature scaled to [0, 1] with plain numpy; a constant column comes out as all zeros
+    values = latest_df[FEATURE_COLS].to_numpy(dtype=np.float32)
+    lo = np.nanmin(values, axis=0)
+    features_scaled = (values - lo) / (np.nanmax(values, axis=0) - lo + np.float32(1e-12))
+    norms = np.linalg.norm(features_scaled, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    # Cosine similarity as one BLAS matrix product over the unit-normalized rows
+    features_unit = features_scaled / norms
+    return latest_df, features_unit @ features_unit.T
+
 
 st.set_page_config(page_title="Country Recommendation", page_icon="🌍")
 
@@ -16,40 +44,25 @@ st.markdown("""
 """)
 
 DATA_PATH = str(Path(__file__).parents[1] / "Global finance data.csv")
-df = load_data(DATA_PATH)
 
 st.write("Select a country to see which other countries are most similar based on GDP Growth, Inflation, and Credit Rating.")
 
-# Prepare features for similarity
-feature_cols = ["GDP_Growth_Rate_Percent", "Inflation_Rate_Percent"]
-# Convert credit rating to numeric for similarity
-if "Credit_Rating" in df.columns:
-    credit_ratings_sorted = sorted(df["Credit_Rating"].dropna().unique(), reverse=True)
-    credit_map = {k: v for v, k in enumerate(credit_ratings_sorted)}
-    df["Credit_Rating_Num"] = df["Credit_Rating"].map(credit_map)
-    feature_cols.append("Credit_Rating_Num")
-else:
-    df["Credit_Rating_Num"] = 0
-    feature_cols.append("Credit_Rating_Num")
-
 # Use only last available row per country
-if "Country" in df.columns and "Date" in df.columns:
-    latest_df = df.sort_values("Date").groupby("Country").tail(1).reset_index(drop=True)
-else:
+state = similarity_index(DATA_PATH)
+if state is None:
     st.error("Country or Date column missing in data.")
     st.stop()
+latest_df, sim = state
 
 country = st.selectbox("Country", latest_df["Country"].unique())
 
 if country:
-    selected = latest_df[latest_df["Country"] == country][feature_cols].values
-    scaler = MinMaxScaler()
-    features_scaled = scaler.fit_transform(latest_df[feature_cols])
-    sim = cosine_similarity(selected, features_scaled)[0]
-    latest_df["Similarity"] = sim
-    recs = latest_df[latest_df["Country"] != country].sort_values("Similarity", ascending=False).head(5)
+    row = np.flatnonzero(latest_df["Country"].to_numpy() == country)[0]
+    recs = latest_df.assign(Similarity=sim[row]).drop(index=row).sort_values("Similarity", ascending=False).head(5)
     st.subheader(f"Top 5 Similar Countries to {country}")
-    st.table(recs[["Country", "GDP_Growth_Rate_Percent", "Inflation_Rate_Percent", "Credit_Rating", "Similarity"]].style.format({"Similarity": "{:.2f}"}))
+    # Five rows: formatting the column up front keeps st.table off the pandas Styler path
+    recs = recs.assign(Similarity=recs["Similarity"].map("{:.2f}".format))
+    st.table(recs[["Country", "GDP_Growth_Rate_Percent", "Inflation_Rate_Percent", "Credit_Rating", "Similarity"]])
     st.info("Similarity is calculated using GDP growth, inflation, and credit rating.")
 else:
     st.warning("No country selected.")
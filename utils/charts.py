@@ -0,0 +1,35 @@
+import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io as pio
+import streamlit as st
+
+from utils.common import RASTER_THRESHOLD, category_raster
+from utils.data import filtered_data, mean_by_country, rasterize_points
+
+
+def scatter_or_raster(csv_path: str, key: tuple, x: str, y: str, color: str, **kwargs) -> go.Figure:
+    # Large frames go out as a fixed-size per-group raster instead of one SVG point per row
+    df = filtered_data(csv_path, key)
+    if len(df) <= RASTER_THRESHOLD:
+        return px.scatter(df, x=x, y=y, color=color, **kwargs)
+    return category_raster(*rasterize_points(csv_path, key, x, y, color), x, y, color)
+
+
+@st.cache_data(show_spinner=False)
+def _country_bar_json(csv_path: str, key: tuple, column: str, colorscale: str) -> str:
+    agg = mean_by_country(csv_path, key, column)
+    values = agg[column].to_numpy()
+    fig = go.Figure(
+        go.Bar(
+            x=agg["Country"].astype(str).to_numpy(),
+            y=values,
+            marker=dict(color=values, colorscale=colorscale, showscale=True, colorbar=dict(title=dict(text=column))),
+        )
+    )
+    fig.update_layout(xaxis_title="Country", yaxis_title=column)
+    return fig.to_json()
+
+
+def country_bar(csv_path: str, key: tuple, column: str, colorscale: str) -> go.Figure:
+    # The serialized figure is cached per filter selection; a rerun only parses JSON
+    return pio.from_json(_country_bar_json(csv_path, key, column, colorscale))
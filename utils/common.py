@@ -0,0 +1,141 @@
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+
+# Shared by the Flask and Streamlit apps; each wraps these in its own cache
+
+
+# Market cap adds up across a country's rows; other metrics are averaged
+ADDITIVE_COLUMNS = ["Market_Cap_Trillion_USD"]
+
+RASTER_THRESHOLD = 5000
+
+
+def aggregate_by_country(df: pd.DataFrame, columns: Tuple[str, ...], extra_keys: Tuple[str, ...] = ()) -> pd.DataFrame:
+    keys = ["Country", *extra_keys]
+    how = {col: "sum" if col in ADDITIVE_COLUMNS else "mean" for col in columns}
+    return df.groupby(keys, sort=False, observed=True)[list(columns)].agg(how).reset_index()
+
+
+def ranked_by_country(df: pd.DataFrame, column: str, extra_keys: Tuple[str, ...] = ()) -> pd.DataFrame:
+    agg = aggregate_by_country(df, (column,), extra_keys)
+    order = np.argsort(-agg[column].to_numpy(), kind="stable")
+    return agg.iloc[order].reset_index(drop=True)
+
+
+def ols_lines(df: pd.DataFrame, x: str, y: str, group: str) -> pd.DataFrame:
+    # Closed-form least-squares fit per group, as endpoints over the group's x range
+    data = df[[group, x, y]].dropna().astype({x: "float64", y: "float64"})
+    data = data.assign(xx=data[x] * data[x], xy=data[x] * data[y])
+    sums = data.groupby(group, sort=False, observed=True).agg(
+        n=(x, "size"), sx=(x, "sum"), sy=(y, "sum"), sxx=("xx", "sum"), sxy=("xy", "sum"), x0=(x, "min"), x1=(x, "max")
+    )
+    var_x = sums["sxx"] - sums["sx"] ** 2 / sums["n"]
+    cov_xy = sums["sxy"] - sums["sx"] * sums["sy"] / sums["n"]
+    sums = sums[(sums["n"] >= 2) & (var_x > 0)]
+    slope = cov_xy[sums.index] / var_x[sums.index]
+    intercept = (sums["sy"] - slope * sums["sx"]) / sums["n"]
+    return pd.DataFrame({"x0": sums["x0"], "x1": sums["x1"], "y0": intercept + slope * sums["x0"], "y1": intercept + slope * sums["x1"]})
+
+
+def correlation_matrix(df: pd.DataFrame, columns: Tuple[str, ...]) -> np.ndarray:
+    values = df[list(columns)].to_numpy(dtype=np.float32)
+    if len(values) < 2:
+        return np.full((len(columns), len(columns)), np.nan, dtype=np.float32)
+    # pandas' pairwise-complete path is only needed when values are missing
+    if np.isnan(values).any():
+        corr = df[list(columns)].corr().to_numpy()
+    else:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr = np.corrcoef(values, rowvar=False)
+    return corr.astype(np.float32).round(2)
+
+
+def latest_by_country(df: pd.DataFrame) -> pd.DataFrame:
+    # Most recent dated row per country; a country with no parseable date keeps its last row
+    dated = df.dropna(subset=["Date"])
+    latest = dated.loc[dated.groupby("Country", observed=True)["Date"].idxmax()]
+    undated = df[df["Country"].notna() & ~df["Country"].isin(latest["Country"])].drop_duplicates("Country", keep="last")
+    return pd.concat([latest, undated]).reset_index(drop=True)
+
+
+def _bin_index(values: np.ndarray, bins: int) -> Tuple[np.ndarray, np.ndarray]:
+    lo, hi = (values.min(), values.max()) if len(values) else (0.0, 1.0)
+    edges = np.linspace(lo, hi, bins + 1)
+    return np.clip(np.searchsorted(edges, values, side="right") - 1, 0, bins - 1), edges
+
+
+def rasterize_points(
+    df: pd.DataFrame, x: str, y: str, group: str, width: int = 200, height: int = 150
+) -> Tuple[np.ndarray, List[str], np.ndarray, np.ndarray]:
+    # Per-group count grids from one bincount, groups in order of first appearance as in px.scatter
+    data = df[[group, x, y]].dropna()
+    codes = data[group].astype("category").cat.codes.to_numpy().astype(np.int64)
+    categories = data[group].astype("category").cat.categories
+    ix, x_edges = _bin_index(data[x].to_numpy(np.float64), width)
+    iy, y_edges = _bin_index(data[y].to_numpy(np.float64), height)
+    counts = np.bincount((codes * height + iy) * width + ix, minlength=len(categories) * height * width)
+    order = pd.unique(codes)
+    counts = counts.reshape(len(categories), height, width)[order]
+    return counts, [str(label) for label in categories[order]], x_edges, y_edges
+
+
+def annotated_heatmap(z: np.ndarray, labels: List[str], colorscale: str, reversescale: bool = False) -> go.Figure:
+    return go.Figure(
+        go.Heatmap(z=z, x=labels, y=labels, texttemplate="%{z:.2f}", colorscale=colorscale, reversescale=reversescale, showscale=True)
+    )
+
+
+def add_trendlines(fig: go.Figure, lines: pd.DataFrame) -> go.Figure:
+    # One line per colour group, in the group's colour like px's trendline="ols"
+    for trace in list(fig.data):
+        if trace.name in lines.index:
+            line = lines.loc[trace.name]
+            fig.add_trace(
+                go.Scatter(
+                    x=[line["x0"], line["x1"]],
+                    y=[line["y0"], line["y1"]],
+                    mode="lines",
+                    line=dict(color=trace.marker.color),
+                    legendgroup=trace.legendgroup,
+                    showlegend=False,
+                    hoverinfo="skip",
+                )
+            )
+    return fig
+
+
+def category_raster(counts: np.ndarray, labels: List[str], x_edges: np.ndarray, y_edges: np.ndarray, x: str, y: str, color: str) -> go.Figure:
+    # Pixels mix group colours by count, opacity follows log density; hover shows coordinates only
+    palette = np.array([px.colors.hex_to_rgb(c) for c in px.colors.qualitative.Plotly], dtype=np.float64)
+    colours = palette[np.arange(len(labels)) % len(palette)]
+    total = counts.sum(axis=0)
+    rgb = np.einsum("ghw,gc->hwc", counts, colours) / np.maximum(total, 1)[..., None]
+    density = np.log1p(total) / np.log1p(max(total.max(), 1))
+    alpha = np.where(total > 0, 80 + 175 * density, 0)
+    dx = (x_edges[1] - x_edges[0]) or 1.0
+    dy = (y_edges[1] - y_edges[0]) or 1.0
+    fig = go.Figure(
+        go.Image(
+            z=np.dstack([rgb, alpha]).round().astype(np.uint8),
+            colormodel="rgba256",
+            x0=x_edges[0] + dx / 2,
+            dx=dx,
+            y0=y_edges[0] + dy / 2,
+            dy=dy,
+            hovertemplate=f"{x}=%{{x:.4g}}<br>{y}=%{{y:.4g}}<extra></extra>",
+        )
+    )
+    # Legend-only marker per group, so the legend and add_trendlines work as on a px.scatter
+    for label, colour in zip(labels, colours):
+        fig.add_trace(
+            go.Scatter(x=[None], y=[None], mode="markers", name=label, legendgroup=label, marker=dict(color="rgb({:.0f},{:.0f},{:.0f})".format(*colour)))
+        )
+    # Image traces otherwise pin square pixels and flip the y axis
+    fig.update_yaxes(autorange=True, scaleanchor=False)
+    fig.update_layout(xaxis_title=x, yaxis_title=y, legend_title_text=color)
+    return fig
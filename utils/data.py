@@ -1,44 +1,201 @@
 import os
-from typing import List, Optional
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 import streamlit as st
 
+from utils import common
+
 
 @st.cache_data(show_spinner=False)
 def load_data(csv_path: str) -> pd.DataFrame:
     if not os.path.exists(csv_path):
         raise FileNotFoundError(f"CSV not found at: {csv_path}")
-    df = pd.read_csv(csv_path)
-    # Parse dates if present
-    if "Date" in df.columns:
+    parquet_path = str(Path(csv_path).with_suffix(".parquet"))
+    # Same columnar copy the Flask app reads; the CSV is only parsed when it is newer than the copy
+    fresh = os.path.exists(parquet_path) and os.path.getmtime(parquet_path) >= os.path.getmtime(csv_path)
+    if fresh:
+        df = pd.read_parquet(parquet_path, engine="pyarrow")
+    else:
+        # The Arrow engine parses multithreaded straight into columnar buffers, dates included
+        header = pd.read_csv(csv_path, nrows=0).columns
+        df = pd.read_csv(csv_path, engine="pyarrow", parse_dates=["Date"] if "Date" in header else None)
+    # Anything not parsed as dates is coerced, as before; an older Parquet copy may hold strings
+    if "Date" in df.columns and not pd.api.types.is_datetime64_any_dtype(df["Date"]):
         df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
+    if not fresh:
+        # Renamed into place once complete; the Flask app may be scanning the same file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(parquet_path) or ".", suffix=".parquet.tmp")
+        os.close(fd)
+        try:
+            df.to_parquet(tmp_path, engine="pyarrow", compression="zstd", row_group_size=65536, index=False)
+            os.replace(tmp_path, parquet_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+    return _downcast(df)
+
+
+CATEGORICAL_COLUMNS = ["Country", "Credit_Rating", "Currency_Code"]
+
+
+def _downcast(df: pd.DataFrame) -> pd.DataFrame:
+    # float32 halves the bytes scanned; categoricals let isin/groupby work on integer codes
+    float_cols = df.select_dtypes("float64").columns
+    df[float_cols] = df[float_cols].astype("float32")
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
     return df
 
 
+def _isin_mask(column: pd.Series, values: List) -> Optional[np.ndarray]:
+    if not isinstance(column.dtype, pd.CategoricalDtype):
+        return column.isin(values).to_numpy()
+    # Lookup on the category codes; None when every category is selected and nothing is missing
+    categories = column.cat.categories
+    wanted = categories.get_indexer(values)
+    wanted = wanted[wanted >= 0]
+    codes = column.cat.codes.to_numpy()
+    if len(np.unique(wanted)) == len(categories) and not (codes < 0).any():
+        return None
+    lookup = np.zeros(len(categories) + 1, dtype=bool)
+    lookup[wanted] = True
+    # Missing values have code -1, which indexes the trailing False slot
+    return lookup[codes]
+
+
 def apply_common_filters(
     df: pd.DataFrame,
     country_options: Optional[List[str]] = None,
     credit_ratings: Optional[List[str]] = None,
     dates: Optional[List[pd.Timestamp]] = None,
+    extra_filters: Optional[Dict[str, List]] = None,
 ) -> pd.DataFrame:
-    filtered = df.copy()
+    # Build one boolean mask and index once instead of materializing a frame per filter
+    terms = []
 
-    if country_options:
-        filtered = filtered[filtered["Country"].isin(country_options)]
-
-    if credit_ratings:
-        filtered = filtered[filtered["Credit_Rating"].isin(credit_ratings)]
+    isin_filters = {"Country": country_options, "Credit_Rating": credit_ratings, **(extra_filters or {})}
+    for column, values in isin_filters.items():
+        if values:
+            mask = _isin_mask(df[column], values)
+            if mask is not None:
+                terms.append(mask)
 
     if dates:
-        # support list of dates or a date range (two endpoints)
         if len(dates) == 2 and dates[0] is not None and dates[1] is not None:
-            start, end = dates
-            filtered = filtered[(filtered["Date"] >= start) & (filtered["Date"] <= end)]
+            start, end = pd.Timestamp(dates[0]).to_datetime64(), pd.Timestamp(dates[1]).to_datetime64()
+            date_values = df["Date"].to_numpy()
+            # The default range spans the whole column; a range covering every row needs no mask
+            if len(date_values) and not (start <= date_values.min() and date_values.max() <= end):
+                terms.append((date_values >= start) & (date_values <= end))
         else:
-            filtered = filtered[filtered["Date"].isin(dates)]
+            terms.append(df["Date"].isin(dates).to_numpy())
+
+    # Every filter at its default: hand back the frame itself, no mask or copy
+    if not terms:
+        return df
+    return df.loc[np.logical_and.reduce(terms)]
+
 
-    return filtered
+def filter_key(
+    country_options: Optional[List[str]] = None,
+    credit_ratings: Optional[List[str]] = None,
+    dates: Optional[List[pd.Timestamp]] = None,
+    extra_filters: Optional[Dict[str, List]] = None,
+) -> tuple:
+    # Hashable, order-insensitive form of a filter selection, used to key the cached frames below
+    extra = tuple(sorted((column, tuple(sorted(values))) for column, values in (extra_filters or {}).items() if values))
+    return tuple(sorted(country_options or ())), tuple(sorted(credit_ratings or ())), tuple(dates or ()), extra
+
+
+@st.cache_data(show_spinner=False)
+def filtered_data(csv_path: str, key: tuple) -> pd.DataFrame:
+    countries, ratings, dates, extra = key
+    return apply_common_filters(load_data(csv_path), list(countries), list(ratings), list(dates), dict(extra))
+
+
+@st.cache_data(show_spinner=False)
+def sorted_by(csv_path: str, key: tuple, column: str, ascending: bool = False) -> pd.DataFrame:
+    # One sort per filter set and column, reused by every rerun that draws that order
+    return filtered_data(csv_path, key).sort_values(column, ascending=ascending)
+
+
+@st.cache_data(show_spinner=False)
+def mean_by_country(csv_path: str, key: tuple, column: str) -> pd.DataFrame:
+    # One bar per country (highest first) instead of an overlapping bar for every dated row
+    agg = filtered_data(csv_path, key).groupby("Country", observed=True, as_index=False)[column].mean()
+    return agg.sort_values(column, ascending=False)
+
+
+def _lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    # Largest-Triangle-Three-Buckets over points sorted by x
+    n = len(x)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    prev = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        cx, cy = x[end:next_end].mean(), y[end:next_end].mean()
+        ax, ay = x[prev], y[prev]
+        area = np.abs((ax - cx) * (y[start:end] - ay) - (ax - x[start:end]) * (cy - ay))
+        prev = start + int(np.argmax(area))
+        selected[i + 1] = prev
+    return selected
+
+
+@st.cache_data(show_spinner=False)
+def downsampled(csv_path: str, key: tuple, x: str, y: str, group: str = "Country", n_out: int = 500) -> pd.DataFrame:
+    # At most n_out points per group, in original row order so colours match the full chart
+    fdf = filtered_data(csv_path, key)
+    data = fdf.dropna(subset=[x, y]).sort_values(x, kind="stable")
+    keep = [
+        rows.index.to_numpy()[_lttb_indices(rows[x].to_numpy(np.float64), rows[y].to_numpy(np.float64), n_out)]
+        for _, rows in data.groupby(group, observed=True, sort=False)
+    ]
+    return fdf.loc[np.sort(np.concatenate(keep))] if keep else fdf
+
+
+@st.cache_data(show_spinner=False)
+def latest_by_country(csv_path: str) -> pd.DataFrame:
+    return common.latest_by_country(load_data(csv_path))
+
+
+# Keyed on (csv_path, key) like filtered_data, so a rerun hashes a path and tuples, not a frame
+
+
+@st.cache_data(show_spinner=False)
+def aggregate_by_country(csv_path: str, key: tuple, columns: Tuple[str, ...], extra_keys: Tuple[str, ...] = ()) -> pd.DataFrame:
+    return common.aggregate_by_country(filtered_data(csv_path, key), columns, extra_keys)
+
+
+@st.cache_data(show_spinner=False)
+def ranked_by_country(csv_path: str, key: tuple, column: str, extra_keys: Tuple[str, ...] = ()) -> pd.DataFrame:
+    return common.ranked_by_country(filtered_data(csv_path, key), column, extra_keys)
+
+
+@st.cache_data(show_spinner=False)
+def ols_lines(csv_path: str, key: tuple, x: str, y: str, group: str) -> pd.DataFrame:
+    return common.ols_lines(filtered_data(csv_path, key), x, y, group)
+
+
+@st.cache_data(show_spinner=False)
+def correlation_matrix(csv_path: str, key: tuple, columns: Tuple[str, ...]) -> np.ndarray:
+    return common.correlation_matrix(filtered_data(csv_path, key), columns)
+
+
+@st.cache_data(show_spinner=False)
+def rasterize_points(
+    csv_path: str, key: tuple, x: str, y: str, group: str, width: int = 200, height: int = 150
+) -> Tuple[np.ndarray, List[str], np.ndarray, np.ndarray]:
+    return common.rasterize_points(filtered_data(csv_path, key), x, y, group, width, height)
 
 
 def get_distinct_values(df: pd.DataFrame) -> dict:
@@ -51,4 +208,7 @@ def get_distinct_values(df: pd.DataFrame) -> dict:
     }
 
 
-
+@st.cache_data(show_spinner=False)
+def distinct_values(csv_path: str) -> dict:
+    # Keyed on the path, so a rerun is a dict lookup with no frame to hash or scan
+    return get_distinct_values(load_data(csv_path))
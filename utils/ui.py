@@ -0,0 +1,33 @@
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+import streamlit as st
+
+from utils.data import distinct_values
+
+
+def sidebar_filters(
+    csv_path: str,
+    heading: str = "### Page Filters",
+    include_index: bool = False,
+    include_currency: bool = False,
+) -> Tuple[List[str], List[str], Optional[List[pd.Timestamp]], Dict[str, List[str]]]:
+    # Shared by every page; the page-specific selections come back as extra_filters for filter_key
+    meta = distinct_values(csv_path)
+    st.sidebar.markdown(heading)
+    countries = st.sidebar.multiselect("Country", options=meta["countries"], default=meta["countries"])
+    extra_filters = {}
+    if include_index:
+        extra_filters["Stock_Index"] = st.sidebar.multiselect("Stock Index", options=meta["stock_indices"], default=meta["stock_indices"])
+    if include_currency:
+        extra_filters["Currency_Code"] = st.sidebar.multiselect("Currency", options=meta["currencies"], default=meta["currencies"])
+    ratings = st.sidebar.multiselect("Credit Rating", options=meta["credit_ratings"], default=meta["credit_ratings"])
+    date_values = meta["dates"]
+    date_filter = None
+    if date_values:
+        min_date, max_date = date_values[0], date_values[-1]
+        date_range = st.sidebar.date_input("Date range", value=(min_date, max_date))
+        # Convert to pandas timestamps
+        if isinstance(date_range, tuple) and len(date_range) == 2:
+            date_filter = [pd.to_datetime(date_range[0]), pd.to_datetime(date_range[1])]
+    return countries, ratings, date_filter, extra_filters